@@ -0,0 +1,52 @@
+#!/usr/bin/env python3
+"""
+Замер масштабирования режима --all-packages по числу процессов.
+Строит синтетический индекс и запускает generate_all_graphs с разным --jobs.
+
+Пример:
+  python benchmarks/bench_all_packages.py --packages 6000 --max-depth 4 --jobs 1 2 4 8
+"""
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+def make_index(packages: int, deps_per_package: int, seed: int = 1) -> dict:
+    """Синтетический индекс: каждый пакет зависит от нескольких пакетов с большими номерами."""
+    rng = random.Random(seed)
+    names = [f"pkg{i}" for i in range(packages)]
+    return {name: rng.sample(names[i + 1:], min(deps_per_package, packages - i - 1))
+            for i, name in enumerate(names)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Замер масштабирования --all-packages')
+    parser.add_argument('--packages', type=int, default=6000)
+    parser.add_argument('--deps', type=int, default=4)
+    parser.add_argument('--max-depth', type=int, default=4)
+    parser.add_argument('--jobs', type=int, nargs='+', default=[1, 2, 4])
+    args = parser.parse_args()
+
+    package_cache = make_index(args.packages, args.deps)
+    print(f"Пакетов: {args.packages}, CPU: {os.cpu_count()}, платформа: {sys.platform}")
+
+    baseline = None
+    for jobs in args.jobs:
+        with tempfile.TemporaryDirectory() as output_dir:
+            started = time.perf_counter()
+            dv.generate_all_graphs(package_cache, output_dir, args.max_depth, None, jobs)
+            elapsed = time.perf_counter() - started
+        baseline = baseline or elapsed
+        print(f"  --jobs {jobs}: {elapsed:.2f} с, ускорение x{baseline / elapsed:.2f}")
+
+
+if __name__ == '__main__':
+    main()
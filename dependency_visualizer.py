@@ -6,10 +6,22 @@
 
 import argparse
 import sys
+import contextlib
+import functools
 import gzip
+import hashlib
 import io
+import json
+import multiprocessing
+import os
 import re
-from typing import Optional, List, Dict, Set
+import shutil
+import sqlite3
+import subprocess
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Optional, List, Dict, Set, Tuple
 from urllib.request import urlopen, Request
 from urllib.error import URLError, HTTPError
 
@@ -61,31 +73,8 @@ class DependencyVisualizer:
         Raises:
             Exception: При ошибке загрузки или распаковки
         """
-        apkindex_url = f"{self.repo_url}/APKINDEX.tar.gz"
-        
-        try:
-            # Создание запроса с User-Agent
-            request = Request(apkindex_url, headers={'User-Agent': 'DependencyVisualizer/1.0'})
-            
-            # Загрузка файла
-            with urlopen(request, timeout=30) as response:
-                tar_gz_data = response.read()
-            
-            # Распаковка gzip
-            with gzip.GzipFile(fileobj=io.BytesIO(tar_gz_data)) as gz:
-                tar_data = gz.read()
-            
-            # В tar-архиве APKINDEX обычно находится как первый файл
-            # Пропускаем заголовок tar (512 байт) и читаем содержимое
-            # Простой парсинг tar без использования tarfile
-            apkindex_content = self._extract_apkindex_from_tar(tar_data)
-            
-            return apkindex_content.decode('utf-8')
-            
-        except (URLError, HTTPError) as e:
-            raise Exception(f"Ошибка загрузки APKINDEX: {e}")
-        except Exception as e:
-            raise Exception(f"Ошибка обработки APKINDEX: {e}")
+        content, _, _ = self._fetch_apkindex_if_modified()
+        return content
     
     def _extract_apkindex_from_tar(self, tar_data: bytes) -> bytes:
         """
@@ -127,6 +116,49 @@ class DependencyVisualizer:
         
         raise Exception("APKINDEX не найден в архиве")
     
+    def _fetch_apkindex_if_modified(self, etag: Optional[str] = None,
+                                    last_modified: Optional[str] = None) -> tuple:
+        """
+        Условная загрузка APKINDEX (If-None-Match / If-Modified-Since).
+        
+        Args:
+            etag: ETag предыдущего ответа
+            last_modified: Last-Modified предыдущего ответа
+            
+        Returns:
+            Кортеж (содержимое или None, если индекс не изменился, ETag, Last-Modified)
+            
+        Raises:
+            Exception: При ошибке загрузки или распаковки
+        """
+        apkindex_url = f"{self.repo_url}/APKINDEX.tar.gz"
+        headers = {'User-Agent': 'DependencyVisualizer/1.0'}
+        if etag:
+            headers['If-None-Match'] = etag
+        if last_modified:
+            headers['If-Modified-Since'] = last_modified
+        
+        try:
+            with urlopen(Request(apkindex_url, headers=headers), timeout=30) as response:
+                tar_gz_data = response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except HTTPError as e:
+            if e.code == 304:
+                return None, etag, last_modified
+            raise Exception(f"Ошибка загрузки APKINDEX: {e}")
+        except URLError as e:
+            raise Exception(f"Ошибка загрузки APKINDEX: {e}")
+        
+        try:
+            with gzip.GzipFile(fileobj=io.BytesIO(tar_gz_data)) as gz:
+                tar_data = gz.read()
+            content = self._extract_apkindex_from_tar(tar_data).decode('utf-8')
+        except Exception as e:
+            raise Exception(f"Ошибка обработки APKINDEX: {e}")
+        
+        return content, etag, last_modified
+    
     def _parse_apkindex(self, apkindex_content: str) -> Dict[str, List[str]]:
         """
         Парсинг содержимого APKINDEX для получения зависимостей пакетов.
@@ -137,36 +169,9 @@ class DependencyVisualizer:
         Returns:
             Словарь {имя_пакета: [список_зависимостей]}
         """
-        packages = {}
-        current_package = None
-        current_deps = []
-        
-        for line in apkindex_content.split('\n'):
-            line = line.strip()
-            
-            if line.startswith('P:'):
-                # Новый пакет
-                if current_package:
-                    packages[current_package] = current_deps
-                current_package = line[2:].strip()
-                current_deps = []
-            
-            elif line.startswith('D:'):
-                # Зависимости пакета
-                deps_line = line[2:].strip()
-                if deps_line:
-                    # Разделяем зависимости по пробелам
-                    for dep in deps_line.split():
-                        # Удаляем версионные требования (например, >=1.0, <2.0)
-                        dep_name = re.split(r'[<>=!]', dep)[0].strip()
-                        if dep_name and dep_name not in current_deps:
-                            current_deps.append(dep_name)
-        
-        # Добавляем последний пакет
-        if current_package:
-            packages[current_package] = current_deps
-        
-        return packages
+        # Единый парсер записей: те же имена зависимостей, что и в экспорте SQLite
+        records = self._parse_apkindex_records(apkindex_content)
+        return {name: [dep for dep, _ in record['depends']] for name, record in records.items()}
     
     def _load_test_repository(self) -> Dict[str, List[str]]:
         """
@@ -203,6 +208,77 @@ class DependencyVisualizer:
         
         return packages
     
+    def _parse_apkindex_records(self, apkindex_content: str) -> Dict[str, Dict]:
+        """
+        Парсинг APKINDEX в полные записи пакетов (версия, provides, зависимости).
+
+        Args:
+            apkindex_content: Содержимое APKINDEX
+
+        Returns:
+            Словарь {имя_пакета: {'version', 'provides', 'depends', 'checksum'}},
+            где provides - список (имя, версия), depends - список (имя, ограничение)
+        """
+        records = {}
+
+        # Записи пакетов в APKINDEX разделены пустыми строками
+        for block in re.split(r'\n\s*\n', apkindex_content):
+            record = {'version': None, 'provides': [], 'depends': [], 'checksum': None}
+            name = None
+
+            for line in block.split('\n'):
+                line = line.strip()
+
+                if line.startswith('P:'):
+                    name = line[2:].strip()
+                elif line.startswith('V:'):
+                    record['version'] = line[2:].strip()
+                elif line.startswith('C:'):
+                    record['checksum'] = line[2:].strip()
+                elif line.startswith('p:'):
+                    for provided in line[2:].split():
+                        provided_name, _, provided_version = provided.partition('=')
+                        record['provides'].append((provided_name, provided_version or None))
+                elif line.startswith('D:'):
+                    # Удаляем версионные требования (>=1.0, <2.0, ~3.11); конфликты (!pkg) пропускаются
+                    for dep in line[2:].split():
+                        dep_name = re.split(r'[<>=!~]', dep)[0].strip()
+                        if dep_name and dep_name not in (d[0] for d in record['depends']):
+                            record['depends'].append((dep_name, dep[len(dep_name):] or None))
+
+            if name:
+                # Без поля C: используем хеш самой записи
+                if not record['checksum']:
+                    record['checksum'] = hashlib.sha1(block.strip().encode('utf-8')).hexdigest()
+                records[name] = record
+
+        return records
+
+    def load_package_records(self) -> Dict[str, Dict]:
+        """
+        Загрузка полных записей пакетов из репозитория или тестового файла.
+
+        Returns:
+            Словарь {имя_пакета: запись}, формат как в _parse_apkindex_records
+        """
+        if self.test_mode:
+            print(f"Загрузка тестового репозитория из {self.repo_url}...")
+            records = {}
+            for package, deps in self._load_test_repository().items():
+                line = f"{package}: {' '.join(deps)}"
+                records[package] = {
+                    'version': None,
+                    'provides': [],
+                    'depends': [(dep, None) for dep in deps],
+                    'checksum': hashlib.sha1(line.encode('utf-8')).hexdigest(),
+                }
+        else:
+            print(f"Загрузка APKINDEX из {self.repo_url}...")
+            records = self._parse_apkindex_records(self._fetch_apkindex())
+
+        print(f"Загружено информации о {len(records)} пакетах")
+        return records
+
     def get_direct_dependencies(self, package_name: str) -> List[str]:
         """
         Получение прямых зависимостей пакета.
@@ -240,67 +316,13 @@ class DependencyVisualizer:
         Returns:
             Словарь {пакет: множество_зависимостей}
         """
-        graph = {}
-        visited = set()  # Посещенные пакеты (для обнаружения циклов)
-        
-        # Стек для DFS: (пакет, глубина)
-        stack = [(self.package_name, 0)]
-        
-        # Дополнительный набор для отслеживания пакетов в текущем пути (обнаружение циклов)
-        path_set = set()
-        
         print(f"\nПостроение графа зависимостей для пакета '{self.package_name}'...")
         print(f"Максимальная глубина: {self.max_depth}")
         if self.filter_substring:
             print(f"Фильтрация пакетов с подстрокой: '{self.filter_substring}'")
         
-        while stack:
-            package, depth = stack.pop()
-            
-            # Проверяем максимальную глубину
-            if depth > self.max_depth:
-                continue
-            
-            # Проверяем фильтр
-            if self.filter_substring and self.filter_substring in package:
-                print(f"  Пропуск пакета '{package}' (содержит подстроку '{self.filter_substring}')")
-                continue
-            
-            # Проверяем, не посещали ли мы уже этот пакет
-            if package in visited:
-                # Если пакет в текущем пути - цикл
-                if package in path_set:
-                    print(f"  Обнаружен цикл: пакет '{package}' уже в пути обхода")
-                continue
-            
-            visited.add(package)
-            path_set.add(package)
-            
-            # Получаем прямые зависимости
-            try:
-                dependencies = self.get_direct_dependencies(package)
-            except Exception as e:
-                print(f"  Ошибка получения зависимостей для '{package}': {e}")
-                dependencies = []
-            
-            # Добавляем в граф
-            if package not in graph:
-                graph[package] = set()
-            
-            # Добавляем зависимости в граф и стек для обхода
-            for dep in dependencies:
-                # Проверяем фильтр для зависимости
-                if self.filter_substring and self.filter_substring in dep:
-                    continue
-                
-                graph[package].add(dep)
-                
-                # Добавляем в стек только если еще не посещали
-                if dep not in visited:
-                    stack.append((dep, depth + 1))
-            
-            # Убираем из текущего пути при возврате
-            # (в реальности это происходит автоматически из-за обхода в ширину стека)
+        graph = walk_dependency_graph(self.get_direct_dependencies, self.package_name,
+                                      self.max_depth, self.filter_substring, verbose=True)
         
         print(f"Построен граф с {len(graph)} узлами")
         
@@ -440,10 +462,6 @@ class DependencyVisualizer:
         Returns:
             Путь к сохраненному файлу
         """
-        import subprocess
-        import tempfile
-        import os
-        
         # Сначала сохраняем Mermaid код в текстовый файл
         mermaid_file = self.output_file.replace('.svg', '.mmd')
         with open(mermaid_file, 'w', encoding='utf-8') as f:
@@ -451,15 +469,8 @@ class DependencyVisualizer:
         
         print(f"Mermaid код сохранен в: {mermaid_file}")
         
-        # Проверяем, доступен ли mmdc (Mermaid CLI)
-        try:
-            result = subprocess.run(['mmdc', '--version'], 
-                                  capture_output=True, 
-                                  text=True, 
-                                  timeout=5)
-            mmdc_available = result.returncode == 0
-        except (FileNotFoundError, subprocess.TimeoutExpired):
-            mmdc_available = False
+        # Проверяем, доступен ли mmdc (Mermaid CLI); результат кешируется на процесс
+        mmdc_available = probe_mmdc() is not None
         
         if mmdc_available:
             # Используем mmdc для конвертации
@@ -487,11 +498,212 @@ class DependencyVisualizer:
             print("Создание простого SVG с текстом Mermaid...")
         
         # Создаем простой SVG с кодом Mermaid и инструкцией
-        svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
+        svg_content = build_preview_svg(self.package_name, mermaid_file, mermaid_code)
+        
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            f.write(svg_content)
+        
+        print(f"SVG с предварительным просмотром сохранен в: {self.output_file}")
+        return self.output_file
+
+    def save_graph_to_html(self, graph: Dict[str, Set[str]]) -> str:
+        """
+        Сохранение графа в интерактивный HTML-файл.
+        Граф встраивается как компактный JSON (таблица имен и списки смежности
+        с целочисленными идентификаторами). При загрузке отображаются только
+        корень и первый уровень, поддеревья раскрываются по щелчку.
+        Файл не требует сети и внешних библиотек.
+
+        Args:
+            graph: Граф зависимостей {пакет: множество_зависимостей}
+
+        Returns:
+            Путь к сохраненному файлу
+        """
+        # Таблица имен: корень первым, остальные по алфавиту
+        names = {self.package_name}
+        for package, deps in graph.items():
+            names.add(package)
+            names.update(deps)
+        names.discard(self.package_name)
+        name_table = [self.package_name] + sorted(names)
+        index = {name: i for i, name in enumerate(name_table)}
+
+        adjacency = [[] for _ in name_table]
+        for package, deps in graph.items():
+            adjacency[index[package]] = sorted(index[dep] for dep in deps)
+
+        data = json.dumps({'names': name_table, 'adj': adjacency},
+                          ensure_ascii=False, separators=(',', ':'))
+        # Защита от преждевременного закрытия тега <script>
+        data = data.replace('</', '<\\/')
+
+        title = (self.package_name.replace('&', '&amp;')
+                 .replace('<', '&lt;').replace('>', '&gt;'))
+        html_content = HTML_TEMPLATE.replace('__TITLE__', title).replace('__DATA__', data)
+
+        with open(self.output_file, 'w', encoding='utf-8') as f:
+            f.write(html_content)
+
+        print(f"Интерактивный HTML ({len(name_table)} узлов) сохранен в: {self.output_file}")
+        return self.output_file
+
+
+# Шаблон интерактивного HTML-представления графа.
+# Узлы создаются в DOM только при раскрытии, поэтому время загрузки
+# не зависит от размера транзитивного замыкания.
+HTML_TEMPLATE = '''<!DOCTYPE html>
+<html lang="ru">
+<head>
+<meta charset="utf-8">
+<title>Граф зависимостей: __TITLE__</title>
+<style>
+  body { font-family: Arial, sans-serif; margin: 20px; color: #333; background: #f9f9f9; }
+  h1 { font-size: 20px; }
+  #search { width: 320px; padding: 4px 6px; font-size: 14px; }
+  #results { margin: 6px 0 16px; padding: 0; list-style: none; max-height: 240px; overflow-y: auto; }
+  #results li { cursor: pointer; color: #0645ad; padding: 1px 0; }
+  #tree ul { list-style: none; margin: 0; padding-left: 20px; border-left: 1px dotted #ccc; }
+  #tree > ul { border-left: none; padding-left: 0; }
+  .node { cursor: pointer; font-family: "Courier New", monospace; white-space: nowrap; }
+  .toggle { display: inline-block; width: 14px; color: #666; }
+  .leaf { color: #999; cursor: default; }
+  .cycle { color: #c33; }
+  .found { background: #ffef9e; }
+</style>
+</head>
+<body>
+<h1>Граф зависимостей: __TITLE__</h1>
+<input id="search" type="search" placeholder="Поиск пакета...">
+<span id="stats"></span>
+<ul id="results"></ul>
+<div id="tree"></div>
+<script id="graph-data" type="application/json">__DATA__</script>
+<script>
+(function () {
+  var data = JSON.parse(document.getElementById('graph-data').textContent);
+  var names = data.names, adj = data.adj;
+  var parents = null;
+
+  function createNode(id, path) {
+    var li = document.createElement('li');
+    var span = document.createElement('span');
+    var toggle = document.createElement('span');
+    var cycle = path.indexOf(id) !== -1;
+    var children = adj[id] || [];
+    toggle.className = 'toggle';
+    span.className = 'node';
+    span.appendChild(toggle);
+    span.appendChild(document.createTextNode(names[id] + (cycle ? ' (цикл)' : '')));
+    li.appendChild(span);
+    li.dataset.id = id;
+    if (cycle) {
+      span.classList.add('cycle');
+    } else if (children.length === 0) {
+      span.classList.add('leaf');
+    } else {
+      toggle.textContent = '+';
+      span.addEventListener('click', function () { toggleNode(li, path.concat([id])); });
+    }
+    return li;
+  }
+
+  function toggleNode(li, path) {
+    var ul = li.querySelector(':scope > ul');
+    var toggle = li.querySelector(':scope > .node > .toggle');
+    if (ul) {
+      ul.hidden = !ul.hidden;
+    } else {
+      ul = document.createElement('ul');
+      adj[path[path.length - 1]].forEach(function (child) {
+        ul.appendChild(createNode(child, path));
+      });
+      li.appendChild(ul);
+    }
+    toggle.textContent = ul.hidden ? '+' : '\\u2212';
+    return ul;
+  }
+
+  function expandPath(target) {
+    if (parents === null) {
+      parents = new Array(names.length).fill(-1);
+      parents[0] = 0;
+      var queue = [0];
+      for (var q = 0; q < queue.length; q++) {
+        (adj[queue[q]] || []).forEach(function (child) {
+          if (parents[child] === -1) { parents[child] = queue[q]; queue.push(child); }
+        });
+      }
+    }
+    var chain = [target];
+    while (chain[0] !== 0) { chain.unshift(parents[chain[0]]); }
+    var li = document.querySelector('#tree > ul > li');
+    for (var i = 1; i < chain.length; i++) {
+      var ul = li.querySelector(':scope > ul');
+      if (!ul || ul.hidden) { ul = toggleNode(li, chain.slice(0, i)); }
+      li = ul.querySelector(':scope > li[data-id="' + chain[i] + '"]');
+    }
+    var prev = document.querySelector('.found');
+    if (prev) { prev.classList.remove('found'); }
+    var node = li.querySelector(':scope > .node');
+    node.classList.add('found');
+    node.scrollIntoView({block: 'center'});
+  }
+
+  var timer = null;
+  document.getElementById('search').addEventListener('input', function (event) {
+    var query = event.target.value.trim().toLowerCase();
+    clearTimeout(timer);
+    timer = setTimeout(function () {
+      var results = document.getElementById('results');
+      results.textContent = '';
+      if (!query) { return; }
+      var shown = 0;
+      for (var id = 0; id < names.length && shown < 100; id++) {
+        if (names[id].toLowerCase().indexOf(query) !== -1) {
+          var item = document.createElement('li');
+          item.textContent = names[id];
+          item.addEventListener('click', expandPath.bind(null, id));
+          results.appendChild(item);
+          shown++;
+        }
+      }
+      if (shown === 0) { results.textContent = 'Ничего не найдено'; }
+    }, 150);
+  });
+
+  document.getElementById('stats').textContent =
+    ' Узлов: ' + names.length + ', рёбер: ' +
+    adj.reduce(function (sum, list) { return sum + list.length; }, 0);
+  var root = document.createElement('ul');
+  var rootNode = createNode(0, []);
+  root.appendChild(rootNode);
+  document.getElementById('tree').appendChild(root);
+  if (adj[0].length) { toggleNode(rootNode, [0]); }
+})();
+</script>
+</body>
+</html>
+'''
+
+
+def build_preview_svg(title: str, mermaid_file: str, mermaid_code: str) -> str:
+    """
+    Построение простого SVG с кодом Mermaid и инструкцией (когда mmdc недоступен).
+    
+    Args:
+        title: Заголовок графа (имя пакета)
+        mermaid_file: Путь к файлу с кодом Mermaid
+        mermaid_code: Код графа в формате Mermaid
+        
+    Returns:
+        Содержимое SVG
+    """
+    svg_content = f'''<?xml version="1.0" encoding="UTF-8"?>
 <svg xmlns="http://www.w3.org/2000/svg" width="800" height="600" viewBox="0 0 800 600">
   <rect width="800" height="600" fill="#f9f9f9"/>
   <text x="400" y="50" text-anchor="middle" font-family="Arial, sans-serif" font-size="20" font-weight="bold" fill="#333">
-    Граф зависимостей: {self.package_name}
+    Граф зависимостей: {title}
   </text>
   <text x="400" y="80" text-anchor="middle" font-family="Arial, sans-serif" font-size="14" fill="#666">
     Для визуализации используйте файл {mermaid_file}
@@ -503,25 +715,737 @@ class DependencyVisualizer:
   <text x="60" y="160" font-family="Courier New, monospace" font-size="11" fill="#333">
     <tspan x="60" dy="0">{mermaid_code.split(chr(10))[0]}</tspan>
 '''
+    
+    # Добавляем строки кода Mermaid (ограничиваем количество)
+    lines = mermaid_code.split('\n')
+    for line in lines[1:35]:  # Первые 34 строки после заголовка
+        svg_content += f'    <tspan x="60" dy="15">{line[:80]}</tspan>\n'
+    
+    if len(lines) > 35:
+        svg_content += f'    <tspan x="60" dy="20">... ({len(lines) - 35} строк скрыто) ...</tspan>\n'
+    
+    svg_content += '''  </text>
+</svg>'''
+    return svg_content
+
+
+@functools.lru_cache(maxsize=None)
+def probe_mmdc() -> Optional[Tuple[int, ...]]:
+    """
+    Проверка доступности Mermaid CLI (mmdc). Выполняется один раз за процесс.
+    
+    Returns:
+        Версия mmdc в виде кортежа чисел (пустой кортеж, если версия
+        не распознана) или None, если mmdc недоступен
+    """
+    try:
+        result = subprocess.run(['mmdc', '--version'],
+                                capture_output=True,
+                                text=True,
+                                timeout=5)
+    except (FileNotFoundError, subprocess.TimeoutExpired):
+        return None
+    
+    if result.returncode != 0:
+        return None
+    
+    match = re.search(r'(\d+(?:\.\d+)*)', result.stdout)
+    return tuple(int(part) for part in match.group(1).split('.')) if match else ()
+
+
+class MermaidRenderQueue:
+    """
+    Очередь пакетного рендеринга файлов .mmd в SVG.
+    mmdc проверяется один раз, файлы рендерятся параллельно ограниченным пулом
+    потоков, несколько графов обрабатываются одним вызовом mmdc (через
+    Markdown-вход, mmdc >= 10). Неизменившиеся графы пропускаются по хешу.
+    """
+    
+    THEME = 'neutral'
+    # Минимальная версия mmdc с поддержкой нескольких диаграмм в Markdown-входе
+    MARKDOWN_BATCH_VERSION = (10,)
+    # Хеш содержимого записывается в конец SVG в виде комментария
+    HASH_MARKER = '<!-- mermaid-sha256: '
+    
+    def __init__(self, jobs: int = 4, batch_size: int = 8, timeout: int = 120):
+        """
+        Инициализация очереди.
         
-        # Добавляем строки кода Mermaid (ограничиваем количество)
-        lines = mermaid_code.split('\n')
-        y_offset = 175
-        for i, line in enumerate(lines[1:35]):  # Первые 34 строки после заголовка
-            svg_content += f'    <tspan x="60" dy="15">{line[:80]}</tspan>\n'
-            y_offset += 15
+        Args:
+            jobs: Максимальное число одновременно работающих процессов mmdc
+            batch_size: Максимальное число графов на один вызов mmdc
+            timeout: Таймаут одного вызова mmdc в секундах
+        """
+        self.jobs = jobs
+        self.batch_size = batch_size
+        self.timeout = timeout
+        self.queue: List[Tuple[str, str]] = []
+    
+    def add(self, mermaid_file: str, svg_file: Optional[str] = None):
+        """
+        Добавление файла в очередь.
         
-        if len(lines) > 35:
-            svg_content += f'    <tspan x="60" dy="20">... ({len(lines) - 35} строк скрыто) ...</tspan>\n'
+        Args:
+            mermaid_file: Путь к файлу .mmd
+            svg_file: Путь к выходному SVG (по умолчанию рядом с .mmd)
+        """
+        if svg_file is None:
+            svg_file = os.path.splitext(mermaid_file)[0] + '.svg'
+        self.queue.append((mermaid_file, svg_file))
+    
+    def _content_hash(self, mermaid_code: str, renderer: str) -> str:
+        """Хеш текста Mermaid вместе с параметрами рендеринга."""
+        key = f"{renderer}\n{self.THEME}\n{mermaid_code}"
+        return hashlib.sha256(key.encode('utf-8')).hexdigest()
+    
+    def _stored_hash(self, svg_file: str) -> Optional[str]:
+        """Чтение хеша из комментария в конце ранее созданного SVG."""
+        try:
+            with open(svg_file, 'rb') as f:
+                f.seek(0, os.SEEK_END)
+                f.seek(max(0, f.tell() - 256))
+                tail = f.read().decode('utf-8', errors='ignore')
+        except OSError:
+            return None
+        
+        position = tail.rfind(self.HASH_MARKER)
+        if position == -1:
+            return None
+        return tail[position + len(self.HASH_MARKER):].split(' ', 1)[0]
+    
+    def _stamp(self, svg_file: str, content_hash: str):
+        """Запись хеша содержимого в конец SVG."""
+        with open(svg_file, 'a', encoding='utf-8') as f:
+            f.write(f"\n{self.HASH_MARKER}{content_hash} -->\n")
+    
+    def _run_mmdc(self, input_file: str, output_file: str) -> bool:
+        """Один вызов mmdc; возвращает True при успехе."""
+        try:
+            result = subprocess.run(
+                ['mmdc', '-i', input_file, '-o', output_file, '-t', self.THEME],
+                capture_output=True,
+                text=True,
+                timeout=self.timeout
+            )
+        except subprocess.TimeoutExpired:
+            print(f"  Таймаут при выполнении mmdc для {input_file}")
+            return False
+        
+        if result.returncode != 0:
+            print(f"  Ошибка mmdc для {input_file}: {result.stderr.strip()}")
+            return False
+        return True
+    
+    def _render_batch(self, batch: List[Tuple[str, str, str, str]],
+                      use_markdown: bool) -> List[str]:
+        """
+        Рендеринг группы графов.
         
-        svg_content += '''  </text>
-</svg>'''
+        Args:
+            batch: Список (mmd, svg, код Mermaid, хеш)
+            use_markdown: Объединять ли группу в один вызов mmdc
+            
+        Returns:
+            Список SVG-файлов, которые не удалось отрендерить
+        """
+        pending = batch
+        
+        if use_markdown and len(batch) > 1:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                markdown_file = os.path.join(tmp_dir, 'batch.md')
+                with open(markdown_file, 'w', encoding='utf-8') as f:
+                    for _, _, mermaid_code, _ in batch:
+                        f.write(f"```mermaid\n{mermaid_code}\n```\n\n")
+                
+                # mmdc сохраняет диаграммы Markdown-входа как batch-1.svg, batch-2.svg, ...
+                self._run_mmdc(markdown_file, os.path.join(tmp_dir, 'batch.svg'))
+                pending = []
+                for number, (mermaid_file, svg_file, mermaid_code, content_hash) in enumerate(batch, 1):
+                    rendered = os.path.join(tmp_dir, f'batch-{number}.svg')
+                    if os.path.exists(rendered):
+                        shutil.move(rendered, svg_file)
+                        self._stamp(svg_file, content_hash)
+                    else:
+                        pending.append((mermaid_file, svg_file, mermaid_code, content_hash))
         
-        with open(self.output_file, 'w', encoding='utf-8') as f:
-            f.write(svg_content)
+        # Отдельные вызовы для графов, не обработанных пакетно
+        failed = []
+        for mermaid_file, svg_file, _, content_hash in pending:
+            if self._run_mmdc(mermaid_file, svg_file):
+                self._stamp(svg_file, content_hash)
+            else:
+                failed.append(svg_file)
+        return failed
+    
+    def run(self) -> Dict[str, int]:
+        """
+        Рендеринг всех файлов очереди.
+        Если mmdc недоступен, создаются SVG с предварительным просмотром.
         
-        print(f"SVG с предварительным просмотром сохранен в: {self.output_file}")
-        return self.output_file
+        Returns:
+            Статистика {'rendered', 'skipped', 'failed'}
+        """
+        version = probe_mmdc()
+        renderer = 'preview' if version is None else 'mmdc ' + '.'.join(map(str, version))
+        
+        jobs = []
+        skipped = 0
+        for mermaid_file, svg_file in self.queue:
+            with open(mermaid_file, 'r', encoding='utf-8') as f:
+                mermaid_code = f.read()
+            content_hash = self._content_hash(mermaid_code, renderer)
+            if self._stored_hash(svg_file) == content_hash:
+                skipped += 1
+                continue
+            jobs.append((mermaid_file, svg_file, mermaid_code, content_hash))
+        self.queue = []
+        
+        failed = []
+        if version is None:
+            print("Mermaid CLI (mmdc) не найден, создаются SVG с текстом Mermaid...")
+            for mermaid_file, svg_file, mermaid_code, content_hash in jobs:
+                title = os.path.splitext(os.path.basename(mermaid_file))[0]
+                with open(svg_file, 'w', encoding='utf-8') as f:
+                    f.write(build_preview_svg(title, mermaid_file, mermaid_code))
+                self._stamp(svg_file, content_hash)
+        elif jobs:
+            use_markdown = version >= self.MARKDOWN_BATCH_VERSION
+            # Равномерно распределяем графы по группам, чтобы загрузить все потоки
+            batch_count = max(min(self.jobs, len(jobs)), -(-len(jobs) // self.batch_size))
+            batches = [jobs[i::batch_count] for i in range(batch_count)]
+            with ThreadPoolExecutor(max_workers=self.jobs) as executor:
+                for batch_failed in executor.map(
+                        lambda batch: self._render_batch(batch, use_markdown), batches):
+                    failed.extend(batch_failed)
+        
+        return {'rendered': len(jobs) - len(failed), 'skipped': skipped, 'failed': len(failed)}
+
+
+class DependencyDatabase:
+    """Индексированная база SQLite с пакетами, provides, версиями и рёбрами графа."""
+
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS meta (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+        CREATE TABLE IF NOT EXISTS packages (
+            id INTEGER PRIMARY KEY,
+            name TEXT NOT NULL UNIQUE,
+            version TEXT,
+            checksum TEXT
+        );
+        CREATE TABLE IF NOT EXISTS provides (
+            package_id INTEGER NOT NULL REFERENCES packages(id),
+            name TEXT NOT NULL,
+            version TEXT
+        );
+        CREATE TABLE IF NOT EXISTS edges (
+            src_id INTEGER NOT NULL REFERENCES packages(id),
+            dep_name TEXT NOT NULL,
+            version_constraint TEXT,
+            dst_id INTEGER REFERENCES packages(id)
+        );
+        CREATE INDEX IF NOT EXISTS idx_provides_name ON provides(name);
+        CREATE INDEX IF NOT EXISTS idx_provides_package ON provides(package_id);
+        CREATE INDEX IF NOT EXISTS idx_edges_src ON edges(src_id, dst_id);
+        CREATE INDEX IF NOT EXISTS idx_edges_dst ON edges(dst_id, src_id);
+        CREATE INDEX IF NOT EXISTS idx_edges_dep_name ON edges(dep_name);
+    '''
+
+    # Транзитивные зависимости пакетов, имена которых соответствуют шаблону GLOB
+    CLOSURE_QUERY = '''
+        WITH RECURSIVE closure(id, depth) AS (
+            SELECT id, 0 FROM packages WHERE name GLOB :pattern
+            UNION
+            SELECT e.dst_id, c.depth + 1
+            FROM closure c
+            JOIN edges e ON e.src_id = c.id
+            JOIN packages p ON p.id = e.dst_id
+            WHERE c.depth < :max_depth
+              AND (:filter IS NULL OR instr(p.name, :filter) = 0)
+        )
+        SELECT p.name, p.version, MIN(c.depth) AS depth
+        FROM closure c JOIN packages p ON p.id = c.id
+        GROUP BY p.id
+        ORDER BY depth, p.name
+    '''
+
+    # Пакеты, транзитивно зависящие от пакетов или provides (например, so:libssl*),
+    # имена которых соответствуют шаблону GLOB
+    RDEPS_QUERY = '''
+        WITH RECURSIVE rdeps(id, depth) AS (
+            SELECT e.src_id, 1
+            FROM edges e
+            JOIN packages p ON p.id = e.src_id
+            WHERE (e.dep_name GLOB :pattern
+                   OR e.dst_id IN (SELECT id FROM packages WHERE name GLOB :pattern))
+              AND (:filter IS NULL OR instr(p.name, :filter) = 0)
+            UNION
+            SELECT e.src_id, r.depth + 1
+            FROM rdeps r
+            JOIN edges e ON e.dst_id = r.id
+            JOIN packages p ON p.id = e.src_id
+            WHERE r.depth < :max_depth
+              AND (:filter IS NULL OR instr(p.name, :filter) = 0)
+        )
+        SELECT p.name, p.version, MIN(r.depth) AS depth
+        FROM rdeps r JOIN packages p ON p.id = r.id
+        GROUP BY p.id
+        ORDER BY depth, p.name
+    '''
+
+    def __init__(self, db_path: str):
+        """
+        Открытие (или создание) базы данных.
+
+        Args:
+            db_path: Путь к файлу базы SQLite
+        """
+        self.db_path = db_path
+        self.connection = sqlite3.connect(db_path)
+        self.connection.executescript(self.SCHEMA)
+
+    def close(self):
+        """Закрытие соединения с базой."""
+        self.connection.close()
+
+    def is_empty(self) -> bool:
+        """Проверка, загружены ли в базу пакеты."""
+        return self.connection.execute('SELECT 1 FROM packages LIMIT 1').fetchone() is None
+
+    def refresh(self, records: Dict[str, Dict], source: str) -> Dict[str, int]:
+        """
+        Инкрементальное обновление базы по записям пакетов.
+        Пакеты с неизменной контрольной суммой не перезаписываются.
+        Все изменения выполняются пакетными вставками в одной транзакции.
+
+        Args:
+            records: Записи пакетов {имя: запись} (см. load_package_records)
+            source: URL репозитория или путь к тестовому файлу
+
+        Returns:
+            Статистика {'added', 'changed', 'removed', 'unchanged'}
+        """
+        conn = self.connection
+        existing = {name: (package_id, checksum) for package_id, name, checksum
+                    in conn.execute('SELECT id, name, checksum FROM packages')}
+
+        added = [name for name in records if name not in existing]
+        changed = [name for name in records
+                   if name in existing and existing[name][1] != records[name]['checksum']]
+        removed = [name for name in existing if name not in records]
+
+        with conn:
+            # Удаляем устаревшие provides и рёбра изменённых и удалённых пакетов
+            stale_ids = [(existing[name][0],) for name in changed + removed]
+            conn.executemany('DELETE FROM edges WHERE src_id = ?', stale_ids)
+            conn.executemany('DELETE FROM provides WHERE package_id = ?', stale_ids)
+            # Рёбра, указывающие на них, будут разрешены заново
+            conn.executemany('UPDATE edges SET dst_id = NULL WHERE dst_id = ?', stale_ids)
+            conn.executemany('DELETE FROM packages WHERE id = ?',
+                             [(existing[name][0],) for name in removed])
+
+            conn.executemany(
+                'UPDATE packages SET version = ?, checksum = ? WHERE id = ?',
+                [(records[name]['version'], records[name]['checksum'], existing[name][0])
+                 for name in changed])
+            conn.executemany(
+                'INSERT INTO packages (name, version, checksum) VALUES (?, ?, ?)',
+                [(name, records[name]['version'], records[name]['checksum']) for name in added])
+
+            ids = dict(conn.execute('SELECT name, id FROM packages'))
+            conn.executemany(
+                'INSERT INTO provides (package_id, name, version) VALUES (?, ?, ?)',
+                [(ids[name], provided, version)
+                 for name in changed + added
+                 for provided, version in records[name]['provides']])
+            conn.executemany(
+                'INSERT INTO edges (src_id, dep_name, version_constraint) VALUES (?, ?, ?)',
+                [(ids[name], dep, constraint)
+                 for name in changed + added
+                 for dep, constraint in records[name]['depends']])
+
+            # Новые имена и provides могут перехватить уже разрешённые рёбра
+            conn.executemany('UPDATE edges SET dst_id = NULL WHERE dep_name = ?',
+                             [(name,) for name in added] +
+                             [(provided,) for name in changed + added
+                              for provided, _ in records[name]['provides']])
+
+            # Разрешение имён зависимостей: сначала по имени пакета, затем по provides
+            conn.execute('''
+                UPDATE edges SET dst_id = COALESCE(
+                    (SELECT id FROM packages WHERE name = edges.dep_name),
+                    (SELECT MIN(package_id) FROM provides WHERE name = edges.dep_name))
+                WHERE dst_id IS NULL
+            ''')
+
+            conn.executemany('INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)',
+                             [('source', source), ('packages', str(len(records)))])
+
+        return {'added': len(added), 'changed': len(changed),
+                'removed': len(removed), 'unchanged': len(records) - len(added) - len(changed)}
+
+    def query(self, kind: str, pattern: str, max_depth: int,
+              filter_substring: Optional[str] = None) -> List[tuple]:
+        """
+        Запрос транзитивного замыкания или обратных зависимостей.
+
+        Args:
+            kind: 'closure' или 'rdeps'
+            pattern: Шаблон GLOB для имён пакетов (для rdeps также provides)
+            max_depth: Максимальная глубина обхода
+            filter_substring: Подстрока для исключения пакетов
+
+        Returns:
+            Список кортежей (имя, версия, глубина)
+        """
+        sql = self.CLOSURE_QUERY if kind == 'closure' else self.RDEPS_QUERY
+        # Пустая подстрока, как и в обходе DFS, означает отсутствие фильтра
+        params = {'pattern': pattern, 'max_depth': max_depth, 'filter': filter_substring or None}
+        return self.connection.execute(sql, params).fetchall()
+
+
+def walk_dependency_graph(get_dependencies: Callable[[str], List[str]], root: str, max_depth: int,
+                          filter_substring: Optional[str] = None,
+                          verbose: bool = False) -> Dict[str, Set[str]]:
+    """
+    Обход графа зависимостей DFS без рекурсии.
+    Учитывает максимальную глубину, фильтрацию и циклические зависимости.
+    
+    Args:
+        get_dependencies: Функция получения прямых зависимостей пакета
+        root: Корневой пакет
+        max_depth: Максимальная глубина анализа
+        filter_substring: Подстрока для фильтрации пакетов
+        verbose: Выводить ли сообщения о пропусках, циклах и ошибках
+        
+    Returns:
+        Словарь {пакет: множество_зависимостей}
+    """
+    graph = {}
+    visited = set()  # Посещенные пакеты (для обнаружения циклов)
+    
+    # Стек для DFS: (пакет, глубина)
+    stack = [(root, 0)]
+    
+    # Дополнительный набор для отслеживания пакетов в текущем пути (обнаружение циклов)
+    path_set = set()
+    
+    while stack:
+        package, depth = stack.pop()
+        
+        # Проверяем максимальную глубину
+        if depth > max_depth:
+            continue
+        
+        # Проверяем фильтр
+        if filter_substring and filter_substring in package:
+            if verbose:
+                print(f"  Пропуск пакета '{package}' (содержит подстроку '{filter_substring}')")
+            continue
+        
+        # Проверяем, не посещали ли мы уже этот пакет
+        if package in visited:
+            # Если пакет в текущем пути - цикл
+            if verbose and package in path_set:
+                print(f"  Обнаружен цикл: пакет '{package}' уже в пути обхода")
+            continue
+        
+        visited.add(package)
+        path_set.add(package)
+        
+        # Получаем прямые зависимости
+        try:
+            dependencies = get_dependencies(package)
+        except Exception as e:
+            if verbose:
+                print(f"  Ошибка получения зависимостей для '{package}': {e}")
+            dependencies = []
+        
+        # Добавляем в граф
+        if package not in graph:
+            graph[package] = set()
+        
+        # Добавляем зависимости в граф и стек для обхода
+        for dep in dependencies:
+            # Проверяем фильтр для зависимости
+            if filter_substring and filter_substring in dep:
+                continue
+            
+            graph[package].add(dep)
+            
+            # Добавляем в стек только если еще не посещали
+            if dep not in visited:
+                stack.append((dep, depth + 1))
+        
+        # Убираем из текущего пути при возврате
+        # (в реальности это происходит автоматически из-за обхода в ширину стека)
+    
+    return graph
+
+
+def build_closure_graph(package_cache: Dict[str, List[str]], root: str, max_depth: int,
+                        filter_substring: Optional[str] = None) -> Dict[str, Set[str]]:
+    """
+    Построение графа зависимостей пакета по уже загруженному индексу без вывода в консоль.
+    
+    Args:
+        package_cache: Словарь {имя_пакета: [список_зависимостей]}
+        root: Корневой пакет
+        max_depth: Максимальная глубина анализа
+        filter_substring: Подстрока для фильтрации пакетов
+        
+    Returns:
+        Словарь {пакет: множество_зависимостей}
+    """
+    return walk_dependency_graph(lambda package: package_cache.get(package, []),
+                                 root, max_depth, filter_substring)
+
+
+def safe_filename(package_name: str) -> str:
+    """Имя файла для пакета (символы вне [A-Za-z0-9_.+-] заменяются на '_')."""
+    return re.sub(r'[^A-Za-z0-9_.+-]', '_', package_name)
+
+
+class DependencyWatcher:
+    """
+    Режим наблюдения: периодический опрос репозитория и инкрементальная
+    перегенерация графов только тех корней, чьи замыкания затронуты изменениями.
+    """
+    
+    def __init__(self, visualizer: DependencyVisualizer, roots: List[str],
+                 output_dir: str, interval: float, jobs: int = 4):
+        """
+        Инициализация наблюдателя.
+        
+        Args:
+            visualizer: Визуализатор с настройками репозитория, глубины и фильтра
+            roots: Корневые пакеты, графы которых поддерживаются актуальными
+            output_dir: Каталог для файлов .mmd и .svg
+            interval: Интервал опроса репозитория в секундах
+            jobs: Число параллельных процессов mmdc
+        """
+        self.visualizer = visualizer
+        self.roots = roots
+        self.output_dir = output_dir
+        self.interval = interval
+        self.render_queue = MermaidRenderQueue(jobs=jobs)
+        
+        self.etag: Optional[str] = None
+        self.last_modified: Optional[str] = None
+        self.file_signature: Optional[tuple] = None
+        self.checksums: Dict[str, str] = {}  # Контрольные суммы записей пакетов
+        self.closures: Dict[str, Set[str]] = {}  # Узлы графа каждого корня
+        self.pending_records: Optional[Dict[str, Dict]] = None  # Необработанные изменения
+    
+    def poll(self) -> Optional[Dict[str, Dict]]:
+        """
+        Дешевая проверка изменений репозитория.
+        Тестовый файл проверяется по времени изменения и размеру,
+        URL - условным HTTP-запросом.
+        
+        Returns:
+            Записи пакетов, если индекс изменился, иначе None
+        """
+        visualizer = self.visualizer
+        
+        if visualizer.test_mode:
+            stat = os.stat(visualizer.repo_url)
+            signature = (stat.st_mtime_ns, stat.st_size)
+            if signature == self.file_signature:
+                return None
+            records = visualizer.load_package_records()
+            # Сигнатура запоминается только после успешного чтения,
+            # иначе файл, пойманный в момент записи, не был бы перечитан
+            self.file_signature = signature
+            return records
+        
+        content, self.etag, self.last_modified = visualizer._fetch_apkindex_if_modified(
+            self.etag, self.last_modified)
+        if content is None:
+            return None
+        return visualizer._parse_apkindex_records(content)
+    
+    def update(self, records: Dict[str, Dict]) -> List[str]:
+        """
+        Перегенерация графов корней, затронутых изменившимися пакетами.
+        Контрольные суммы и замыкания сохраняются только после успешной
+        перегенерации, поэтому при ошибке изменения будут учтены повторно.
+        
+        Args:
+            records: Новые записи пакетов
+            
+        Returns:
+            Список перегенерированных корней
+            
+        Raises:
+            Exception: При ошибке записи или рендеринга графов
+        """
+        checksums = {name: record['checksum'] for name, record in records.items()}
+        changed = {name for name in checksums.keys() | self.checksums.keys()
+                   if checksums.get(name) != self.checksums.get(name)}
+        
+        dirty = [root for root in self.roots
+                 if root not in self.closures or self.closures[root] & changed]
+        if changed:
+            print(f"Изменено пакетов: {len(changed)}, затронуто графов: {len(dirty)}")
+        if not dirty:
+            self.checksums = checksums
+            return []
+        
+        package_cache = {name: [dep for dep, _ in record['depends']]
+                         for name, record in records.items()}
+        closures = dict(self.closures)
+        self.render_queue.queue = []
+        os.makedirs(self.output_dir, exist_ok=True)
+        
+        for root in dirty:
+            graph = build_closure_graph(package_cache, root,
+                                        self.visualizer.max_depth,
+                                        self.visualizer.filter_substring)
+            nodes = set(graph)
+            for deps in graph.values():
+                nodes.update(deps)
+            closures[root] = nodes
+            
+            mermaid_file = os.path.join(self.output_dir, safe_filename(root) + '.mmd')
+            with open(mermaid_file, 'w', encoding='utf-8') as f:
+                f.write(self.visualizer.generate_mermaid(graph))
+            self.render_queue.add(mermaid_file)
+        
+        stats = self.render_queue.run()
+        if stats['failed']:
+            raise Exception(f"не удалось отрендерить SVG: {stats['failed']}")
+        
+        self.checksums = checksums
+        self.closures = closures
+        print(f"Перегенерировано графов: {len(dirty)} ({', '.join(dirty)}), "
+              f"SVG отрендерено: {stats['rendered']}")
+        return dirty
+    
+    def run(self, max_cycles: Optional[int] = None):
+        """
+        Цикл наблюдения (до прерывания или max_cycles опросов).
+        
+        Args:
+            max_cycles: Максимальное число опросов (None - бесконечно)
+        """
+        cycle = 0
+        while max_cycles is None or cycle < max_cycles:
+            if cycle:
+                time.sleep(self.interval)
+            cycle += 1
+            
+            try:
+                records = self.poll()
+                # Изменения, не обработанные из-за ошибки, повторяются даже без нового индекса
+                if records is None:
+                    records = self.pending_records
+                if records is not None:
+                    self.pending_records = records
+                    self.update(records)
+                    self.pending_records = None
+            except Exception as e:
+                print(f"Ошибка обновления графов: {e}", file=sys.stderr)
+
+
+# Индекс и настройки для рабочих процессов generate_all_graphs.
+# На Linux рабочие процессы создаются через fork и наследуют его от родителя
+# без сериализации; на macOS и Windows (spawn) он передается один раз
+# на процесс через инициализатор пула.
+_SHARED_INDEX: Optional[dict] = None
+
+
+def _init_graph_worker(shared_index: dict):
+    """Инициализатор рабочего процесса (для методов запуска без fork)."""
+    global _SHARED_INDEX
+    _SHARED_INDEX = shared_index
+
+
+def _generate_graphs_chunk(roots: List[str]) -> Tuple[int, int, int]:
+    """
+    Генерация графов для группы корневых пакетов в рабочем процессе.
+    
+    Args:
+        roots: Корневые пакеты
+        
+    Returns:
+        Кортеж (число графов, узлов, рёбер)
+    """
+    shared = _SHARED_INDEX
+    visualizer = DependencyVisualizer('', '', False, '', shared['max_depth'], shared['filter'])
+    nodes = edges = 0
+    
+    for root in roots:
+        graph = build_closure_graph(shared['cache'], root, shared['max_depth'], shared['filter'])
+        base = os.path.join(shared['output_dir'], safe_filename(root))
+        
+        with open(base + '.mmd', 'w', encoding='utf-8') as f:
+            f.write(visualizer.generate_mermaid(graph))
+        with open(base + '.json', 'w', encoding='utf-8') as f:
+            json.dump({'package': root,
+                       'dependencies': {package: sorted(deps) for package, deps in sorted(graph.items())}},
+                      f, ensure_ascii=False, separators=(',', ':'))
+        
+        nodes += len(graph)
+        edges += sum(len(deps) for deps in graph.values())
+    
+    return len(roots), nodes, edges
+
+
+def generate_all_graphs(package_cache: Dict[str, List[str]], output_dir: str, max_depth: int,
+                        filter_substring: Optional[str] = None, jobs: int = 1) -> Dict[str, int]:
+    """
+    Параллельная генерация графов (Mermaid и JSON) для всех пакетов индекса.
+    Корневые пакеты распределяются небольшими группами по пулу процессов.
+    
+    Args:
+        package_cache: Словарь {имя_пакета: [список_зависимостей]}
+        output_dir: Каталог для файлов графов
+        max_depth: Максимальная глубина анализа
+        filter_substring: Подстрока для фильтрации пакетов
+        jobs: Число рабочих процессов
+        
+    Returns:
+        Статистика {'graphs', 'nodes', 'edges'}
+    """
+    global _SHARED_INDEX
+    os.makedirs(output_dir, exist_ok=True)
+    
+    roots = sorted(name for name in package_cache
+                   if not (filter_substring and filter_substring in name))
+    shared_index = {'cache': package_cache, 'output_dir': output_dir,
+                    'max_depth': max_depth, 'filter': filter_substring}
+    
+    # Мелкие группы выравнивают нагрузку: размеры замыканий сильно различаются
+    chunk_size = max(1, len(roots) // (jobs * 16))
+    chunks = [roots[i:i + chunk_size] for i in range(0, len(roots), chunk_size)]
+    stats = {'graphs': 0, 'nodes': 0, 'edges': 0}
+    
+    # fork запрашивается явно (с Python 3.14 по умолчанию на Linux - forkserver):
+    # в этом процессе нет потоков, поэтому fork безопасен. На macOS fork
+    # небезопасен, там и на Windows используется spawn с инициализатором
+    _SHARED_INDEX = shared_index
+    try:
+        if jobs == 1 or len(chunks) <= 1:
+            pool = None
+        elif sys.platform.startswith('linux'):
+            pool = multiprocessing.get_context('fork').Pool(processes=jobs)
+        else:
+            pool = multiprocessing.get_context('spawn').Pool(
+                processes=jobs, initializer=_init_graph_worker, initargs=(shared_index,))
+        
+        results = pool.imap_unordered(_generate_graphs_chunk, chunks) if pool else map(_generate_graphs_chunk, chunks)
+        with pool or contextlib.nullcontext():
+            for graphs, nodes, edges in results:
+                stats['graphs'] += graphs
+                stats['nodes'] += nodes
+                stats['edges'] += edges
+    finally:
+        _SHARED_INDEX = None
+    
+    return stats
 
 
 def validate_arguments(args):
@@ -534,6 +1458,27 @@ def validate_arguments(args):
     Raises:
         ValueError: При некорректных значениях параметров
     """
+    # Проверка числа параллельных процессов
+    if args.jobs is not None and args.jobs <= 0:
+        raise ValueError(f"Число параллельных процессов должно быть положительным (указано: {args.jobs})")
+    
+    # Пакетный рендеринг не требует пакета и репозитория
+    if args.render:
+        for mermaid_file in args.render:
+            if not os.path.isfile(mermaid_file):
+                raise ValueError(f"Файл Mermaid не найден: {mermaid_file}")
+        return
+    
+    # Режимы наблюдения и генерации для всех пакетов не требуют имени пакета
+    if args.watch or args.all_packages:
+        if not args.repo_url or not args.repo_url.strip():
+            raise ValueError("URL репозитория или путь к файлу не может быть пустым")
+        if args.watch and args.watch_interval <= 0:
+            raise ValueError(f"Интервал опроса должен быть положительным (указано: {args.watch_interval})")
+        if args.max_depth <= 0 or args.max_depth > 100:
+            raise ValueError(f"Максимальная глубина должна быть в диапазоне 1..100 (указано: {args.max_depth})")
+        return
+    
     # Проверка имени пакета
     if not args.package:
         raise ValueError("Имя пакета не может быть пустым")
@@ -541,11 +1486,11 @@ def validate_arguments(args):
     if not args.package.strip():
         raise ValueError("Имя пакета содержит только пробелы")
     
-    # Проверка URL репозитория
-    if not args.repo_url:
+    # Проверка URL репозитория (запрос --db-query к заполненной базе обходится без него)
+    if not args.repo_url and not args.db_query:
         raise ValueError("URL репозитория или путь к файлу не может быть пустым")
     
-    if not args.repo_url.strip():
+    if args.repo_url is not None and not args.repo_url.strip():
         raise ValueError("URL репозитория содержит только пробелы")
     
     # Проверка имени выходного файла
@@ -556,8 +1501,8 @@ def validate_arguments(args):
         raise ValueError("Имя выходного файла содержит только пробелы")
     
     # Проверка расширения файла
-    if not args.output.lower().endswith('.svg'):
-        raise ValueError("Выходной файл должен иметь расширение .svg")
+    if not args.output.lower().endswith(('.svg', '.html')):
+        raise ValueError("Выходной файл должен иметь расширение .svg или .html")
     
     # Проверка максимальной глубины
     if args.max_depth <= 0:
@@ -569,6 +1514,10 @@ def validate_arguments(args):
     # Проверка подстроки фильтрации (опциональный параметр)
     if args.filter and not args.filter.strip():
         raise ValueError("Подстрока для фильтрации содержит только пробелы")
+    
+    # Проверка режима базы данных
+    if args.db_query and not args.db:
+        raise ValueError("Параметр --db-query требует указания --db")
 
 
 def parse_arguments():
@@ -586,21 +1535,69 @@ def parse_arguments():
   %(prog)s --package busybox --repo-url https://dl-cdn.alpinelinux.org/alpine/v3.18/main/x86_64 --output graph.svg
   %(prog)s --package A --repo-url test_repo.txt --test-mode --output test_graph.svg --max-depth 3
   %(prog)s --package musl --repo-url https://dl-cdn.alpinelinux.org/alpine/v3.18/main/x86_64 --output musl.svg --filter dev
+  %(prog)s --package busybox --repo-url https://dl-cdn.alpinelinux.org/alpine/v3.18/main/x86_64 --output busybox.html
+  %(prog)s --render graph_A.mmd graph_L.mmd graph_P.mmd --jobs 4
         """
     )
     
     parser.add_argument(
         '--package',
         type=str,
-        required=True,
-        help='Имя анализируемого пакета'
+        help='Имя анализируемого пакета (обязательный, кроме режимов --render, --watch и --all-packages)'
     )
     
     parser.add_argument(
         '--repo-url',
         type=str,
-        required=True,
-        help='URL-адрес репозитория Alpine Linux или путь к файлу тестового репозитория'
+        help='URL-адрес репозитория Alpine Linux или путь к файлу тестового репозитория '
+             '(обязательный, кроме режима --render и запросов --db-query к заполненной базе)'
+    )
+    
+    parser.add_argument(
+        '--render',
+        nargs='+',
+        metavar='FILE.mmd',
+        default=None,
+        help='Пакетный рендеринг готовых файлов Mermaid в SVG (рядом с исходными файлами); '
+             'неизменившиеся графы пропускаются'
+    )
+    
+    parser.add_argument(
+        '--watch',
+        nargs='+',
+        metavar='PACKAGE',
+        default=None,
+        help='Режим наблюдения: опрашивать репозиторий и перегенерировать графы '
+             'указанных пакетов только при изменении их зависимостей'
+    )
+    
+    parser.add_argument(
+        '--watch-interval',
+        type=float,
+        default=60,
+        help='Интервал опроса репозитория в режиме --watch, секунды (по умолчанию: 60)'
+    )
+    
+    parser.add_argument(
+        '--all-packages',
+        action='store_true',
+        default=False,
+        help='Параллельная генерация графов (Mermaid и JSON) для всех пакетов репозитория'
+    )
+    
+    parser.add_argument(
+        '--output-dir',
+        type=str,
+        default='.',
+        help='Каталог для файлов графов в режимах --watch и --all-packages (по умолчанию: текущий)'
+    )
+    
+    parser.add_argument(
+        '--jobs',
+        type=int,
+        default=None,
+        help='Число параллельных процессов: mmdc в режимах --render и --watch (по умолчанию: 4), '
+             'рабочих процессов в режиме --all-packages (по умолчанию: число ядер CPU)'
     )
     
     parser.add_argument(
@@ -614,7 +1611,8 @@ def parse_arguments():
         '--output',
         type=str,
         default='dependency_graph.svg',
-        help='Имя сгенерированного файла с изображением графа (по умолчанию: dependency_graph.svg)'
+        help='Имя сгенерированного файла с изображением графа: .svg или интерактивный .html '
+             '(по умолчанию: dependency_graph.svg)'
     )
     
     parser.add_argument(
@@ -638,9 +1636,171 @@ def parse_arguments():
         help='Режим вывода обратных зависимостей (пакеты, которые зависят от данного пакета)'
     )
     
+    parser.add_argument(
+        '--db',
+        type=str,
+        default=None,
+        help='Путь к базе SQLite: экспорт (инкрементальное обновление) индекса пакетов и графа'
+    )
+    
+    parser.add_argument(
+        '--db-query',
+        choices=['closure', 'rdeps'],
+        default=None,
+        help='Запрос к базе --db без повторного разбора APKINDEX: транзитивные (closure) '
+             'или обратные (rdeps) зависимости; --package задает шаблон GLOB, например "so:libssl*"; '
+             '--repo-url нужен, только если база еще пуста'
+    )
+    
     return parser.parse_args()
 
 
+def run_render_mode(args) -> int:
+    """
+    Пакетный рендеринг файлов Mermaid через общую очередь.
+    
+    Args:
+        args: Распарсенные аргументы
+        
+    Returns:
+        Код возврата
+    """
+    print("=" * 60)
+    jobs = args.jobs or 4
+    print(f"ПАКЕТНЫЙ РЕНДЕРИНГ: {len(args.render)} файлов, потоков: {jobs}")
+    print("=" * 60)
+    
+    queue = MermaidRenderQueue(jobs=jobs)
+    for mermaid_file in args.render:
+        queue.add(mermaid_file)
+    
+    try:
+        stats = queue.run()
+    except Exception as e:
+        print(f"Ошибка при пакетном рендеринге: {e}", file=sys.stderr)
+        return 6
+    
+    print(f"Отрендерено: {stats['rendered']}, пропущено без изменений: {stats['skipped']}, "
+          f"ошибок: {stats['failed']}")
+    print("=" * 60)
+    return 6 if stats['failed'] else 0
+
+
+def run_watch_mode(args) -> int:
+    """
+    Наблюдение за репозиторием с инкрементальной перегенерацией графов.
+    
+    Args:
+        args: Распарсенные аргументы
+        
+    Returns:
+        Код возврата
+    """
+    visualizer = DependencyVisualizer(
+        package_name=', '.join(args.watch),
+        repo_url=args.repo_url,
+        test_mode=args.test_mode,
+        output_file=args.output_dir,
+        max_depth=args.max_depth,
+        filter_substring=args.filter
+    )
+    visualizer.print_config()
+    print(f"Режим наблюдения: опрос каждые {args.watch_interval} с (Ctrl+C для выхода)")
+    
+    watcher = DependencyWatcher(visualizer, args.watch, args.output_dir,
+                                args.watch_interval, jobs=args.jobs or 4)
+    try:
+        watcher.run()
+    except KeyboardInterrupt:
+        print("\nНаблюдение остановлено")
+    return 0
+
+
+def run_all_packages_mode(args) -> int:
+    """
+    Параллельная генерация графов для всех пакетов репозитория.
+    
+    Args:
+        args: Распарсенные аргументы
+        
+    Returns:
+        Код возврата
+    """
+    visualizer = DependencyVisualizer(
+        package_name='(все пакеты)',
+        repo_url=args.repo_url,
+        test_mode=args.test_mode,
+        output_file=args.output_dir,
+        max_depth=args.max_depth,
+        filter_substring=args.filter
+    )
+    visualizer.print_config()
+    
+    try:
+        records = visualizer.load_package_records()
+        package_cache = {name: [dep for dep, _ in record['depends']]
+                         for name, record in records.items()}
+        
+        jobs = args.jobs or os.cpu_count() or 1
+        print(f"\nГенерация графов для {len(package_cache)} пакетов, процессов: {jobs}...")
+        started = time.monotonic()
+        stats = generate_all_graphs(package_cache, args.output_dir, args.max_depth,
+                                    args.filter, jobs)
+    except Exception as e:
+        print(f"Ошибка при генерации графов: {e}", file=sys.stderr)
+        return 4
+    
+    print(f"Создано графов: {stats['graphs']} (узлов: {stats['nodes']}, рёбер: {stats['edges']}) "
+          f"за {time.monotonic() - started:.2f} с")
+    print(f"Файлы .mmd и .json сохранены в: {args.output_dir}")
+    print("=" * 60)
+    return 0
+
+
+def run_database_mode(visualizer: DependencyVisualizer, args) -> int:
+    """
+    Экспорт индекса в SQLite и/или выполнение запроса к базе.
+    Без --db-query база обновляется из репозитория; с --db-query запрос
+    выполняется по уже загруженной базе (обновление - только если она пуста).
+    
+    Args:
+        visualizer: Настроенный визуализатор
+        args: Распарсенные аргументы
+        
+    Returns:
+        Код возврата
+    """
+    print("\n" + "=" * 60)
+    print(f"БАЗА ДАННЫХ SQLITE: {args.db}")
+    print("=" * 60)
+    
+    try:
+        database = DependencyDatabase(args.db)
+        try:
+            if not args.db_query or database.is_empty():
+                if not args.repo_url:
+                    raise Exception("База данных пуста: для загрузки индекса укажите --repo-url")
+                stats = database.refresh(visualizer.load_package_records(), args.repo_url)
+                print(f"Добавлено: {stats['added']}, изменено: {stats['changed']}, "
+                      f"удалено: {stats['removed']}, без изменений: {stats['unchanged']}")
+            
+            if args.db_query:
+                rows = database.query(args.db_query, args.package, args.max_depth, args.filter)
+                title = 'Транзитивные зависимости' if args.db_query == 'closure' else 'Обратные зависимости'
+                print(f"\n{title} для '{args.package}': {len(rows)}")
+                for name, version, depth in rows:
+                    print(f"  [{depth}] {name}" + (f" {version}" if version else ""))
+        finally:
+            database.close()
+    
+    except Exception as e:
+        print(f"Ошибка работы с базой данных: {e}", file=sys.stderr)
+        return 7
+    
+    print("=" * 60)
+    return 0
+
+
 def main():
     """Главная функция приложения."""
     try:
@@ -650,6 +1810,18 @@ def main():
         # Валидация аргументов
         validate_arguments(args)
         
+        # Пакетный рендеринг готовых файлов Mermaid
+        if args.render:
+            return run_render_mode(args)
+        
+        # Режим наблюдения за репозиторием
+        if args.watch:
+            return run_watch_mode(args)
+        
+        # Генерация графов для всех пакетов репозитория
+        if args.all_packages:
+            return run_all_packages_mode(args)
+        
         # Создание визуализатора
         visualizer = DependencyVisualizer(
             package_name=args.package,
@@ -663,6 +1835,10 @@ def main():
         # Вывод конфигурации
         visualizer.print_config()
         
+        # Режим базы данных SQLite
+        if args.db:
+            return run_database_mode(visualizer, args)
+        
         # Этап 2: Получение и вывод прямых зависимостей
         print("\n" + "=" * 60)
         print(f"ПРЯМЫЕ ЗАВИСИМОСТИ ПАКЕТА '{args.package}'")
@@ -739,6 +1915,14 @@ def main():
         print("=" * 60)
         
         try:
+            # Интерактивный HTML вместо Mermaid/SVG
+            if args.output.lower().endswith('.html'):
+                output_path = visualizer.save_graph_to_html(graph)
+                print(f"\n✓ Визуализация завершена")
+                print(f"  HTML: {output_path}")
+                print("=" * 60)
+                return 0
+
             # Генерируем Mermaid код
             mermaid_code = visualizer.generate_mermaid(graph)
             print("\nГенерация Mermaid кода...")
@@ -0,0 +1,72 @@
+"""
+Тесты параллельной генерации графов для всех пакетов (generate_all_graphs).
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+PACKAGE_CACHE = {
+    'A': ['B', 'C'],
+    'B': ['D', 'E'],
+    'C': ['F'],
+    'D': ['G'],
+    'E': ['G', 'H'],
+    'F': ['I'],
+    'G': [],
+    'H': ['I', 'J'],
+    'I': [],
+    'J': [],
+    'L': ['M', 'N'],
+    'M': ['L', 'O'],
+    'N': ['N'],
+    'O': [],
+    'dev-tools': ['A', 'dev-libs'],
+    'dev-libs': [],
+}
+
+
+class GenerateAllGraphsTest(unittest.TestCase):
+    """Последовательный и параллельный режимы дают одинаковые файлы."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+    def _generate(self, name, jobs, filter_substring=None):
+        output_dir = os.path.join(self.tmp_dir.name, name)
+        stats = dv.generate_all_graphs(PACKAGE_CACHE, output_dir, 10, filter_substring, jobs)
+        files = {}
+        for file_name in sorted(os.listdir(output_dir)):
+            with open(os.path.join(output_dir, file_name), encoding='utf-8') as f:
+                files[file_name] = f.read()
+        return stats, files
+
+    def test_parallel_output_matches_sequential(self):
+        sequential_stats, sequential_files = self._generate('sequential', jobs=1)
+        parallel_stats, parallel_files = self._generate('parallel', jobs=2)
+
+        self.assertEqual(parallel_stats, sequential_stats)
+        self.assertEqual(sequential_stats['graphs'], len(PACKAGE_CACHE))
+        self.assertEqual(parallel_files, sequential_files)
+        self.assertEqual(len(sequential_files), 2 * len(PACKAGE_CACHE))
+        self.assertIn('A --> B', sequential_files['A.mmd'])
+        self.assertIn('"L":["M","N"]', sequential_files['L.json'])
+
+    def test_filter_excludes_roots_and_dependencies(self):
+        stats, files = self._generate('filtered', jobs=2, filter_substring='dev')
+
+        self.assertEqual(stats['graphs'], len(PACKAGE_CACHE) - 2)
+        self.assertNotIn('dev-tools.mmd', files)
+        self.assertNotIn('dev-libs.json', files)
+        self.assertTrue(all('dev' not in content for content in files.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,154 @@
+"""
+Тесты экспорта индекса в SQLite (DependencyDatabase) и разбора APKINDEX.
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+INDEX_V1 = """C:Q1git=
+P:git
+V:2.43.0-r0
+D:curl
+
+C:Q1curl=
+P:curl
+V:8.5.0-r0
+D:so:libssl.so.3 so:libc.musl-x86_64.so.1
+
+C:Q1ssl=
+P:libssl3
+V:3.1.4-r0
+D:so:libcrypto.so.3
+p:so:libssl.so.3=3
+
+C:Q1crypto=
+P:libcrypto3
+V:3.1.4-r0
+p:so:libcrypto.so.3=3
+
+C:Q1musl=
+P:musl
+V:1.2.4-r2
+p:so:libc.musl-x86_64.so.1=1
+"""
+
+# so:libssl.so.3 переходит от libssl3 к новому пакету libssl4
+INDEX_V2 = INDEX_V1.replace(
+    "C:Q1ssl=\nP:libssl3\nV:3.1.4-r0\nD:so:libcrypto.so.3\np:so:libssl.so.3=3",
+    "C:Q1ssl2=\nP:libssl3\nV:3.1.4-r1\nD:so:libcrypto.so.3") + """
+C:Q1ssl4=
+P:libssl4
+V:4.0.0-r0
+D:so:libcrypto.so.3
+p:so:libssl.so.3=3
+"""
+
+# libssl4 удален: зависимость curl остается неразрешенной
+INDEX_V3 = INDEX_V2[:INDEX_V2.index("C:Q1ssl4=")]
+
+
+class DependencyDatabaseTest(unittest.TestCase):
+    """Разрешение provides, инкрементальное обновление и рекурсивные запросы."""
+
+    def setUp(self):
+        self.visualizer = dv.DependencyVisualizer('', '', False, '', 10)
+        self.database = dv.DependencyDatabase(':memory:')
+        self.addCleanup(self.database.close)
+        self.stats = self._refresh(INDEX_V1)
+
+    def _refresh(self, index):
+        return self.database.refresh(self.visualizer._parse_apkindex_records(index), 'test')
+
+    def _names(self, kind, pattern, max_depth=10, filter_substring=None):
+        return [(name, depth) for name, _, depth
+                in self.database.query(kind, pattern, max_depth, filter_substring)]
+
+    def _dangling_edges(self):
+        return self.database.connection.execute('''
+            SELECT COUNT(*) FROM edges
+            WHERE src_id NOT IN (SELECT id FROM packages)
+               OR (dst_id IS NOT NULL AND dst_id NOT IN (SELECT id FROM packages))
+        ''').fetchone()[0]
+
+    def test_rdeps_through_provides(self):
+        self.assertEqual(self._names('rdeps', 'so:libssl*'), [('curl', 1), ('git', 2)])
+        self.assertEqual(self._names('rdeps', 'libcrypto3'),
+                         [('libssl3', 1), ('curl', 2), ('git', 3)])
+
+    def test_closure_resolves_provides_and_keeps_versions(self):
+        rows = self.database.query('closure', 'git', 10)
+        self.assertEqual(rows, [('git', '2.43.0-r0', 0), ('curl', '8.5.0-r0', 1),
+                                ('libssl3', '3.1.4-r0', 2), ('musl', '1.2.4-r2', 2),
+                                ('libcrypto3', '3.1.4-r0', 3)])
+
+    def test_unchanged_records_are_not_rewritten(self):
+        self.assertEqual(self.stats, {'added': 5, 'changed': 0, 'removed': 0, 'unchanged': 0})
+        self.assertEqual(self._refresh(INDEX_V1),
+                         {'added': 0, 'changed': 0, 'removed': 0, 'unchanged': 5})
+
+    def test_moved_provide_is_resolved_again(self):
+        self.assertEqual(self._refresh(INDEX_V2),
+                         {'added': 1, 'changed': 1, 'removed': 0, 'unchanged': 4})
+
+        self.assertEqual(self._names('rdeps', 'libssl4'), [('curl', 1), ('git', 2)])
+        self.assertEqual(self._names('rdeps', 'libssl3'), [])
+        closure = dict(self._names('closure', 'curl'))
+        self.assertIn('libssl4', closure)
+        self.assertNotIn('libssl3', closure)
+        self.assertEqual(self._dangling_edges(), 0)
+
+    def test_removed_package_leaves_no_dangling_edges(self):
+        self._refresh(INDEX_V2)
+        self.assertEqual(self._refresh(INDEX_V3),
+                         {'added': 0, 'changed': 0, 'removed': 1, 'unchanged': 5})
+
+        self.assertEqual(self._dangling_edges(), 0)
+        connection = self.database.connection
+        self.assertEqual(connection.execute(
+            "SELECT COUNT(*) FROM provides WHERE name = 'so:libssl.so.3'").fetchone()[0], 0)
+        self.assertEqual(connection.execute(
+            "SELECT dst_id FROM edges WHERE dep_name = 'so:libssl.so.3'").fetchall(), [(None,)])
+        self.assertEqual(self._names('rdeps', 'so:libssl*'), [('curl', 1), ('git', 2)])
+        self.assertEqual(self._names('closure', 'curl'), [('curl', 0), ('musl', 1)])
+
+    def test_max_depth(self):
+        self.assertEqual(self._names('closure', 'git', max_depth=1), [('git', 0), ('curl', 1)])
+        self.assertEqual(self._names('rdeps', 'libcrypto3', max_depth=2),
+                         [('libssl3', 1), ('curl', 2)])
+
+    def test_filter_is_applied_during_recursion(self):
+        self.assertEqual(self._names('closure', 'git', filter_substring='libssl'),
+                         [('git', 0), ('curl', 1), ('musl', 2)])
+        self.assertEqual(self._names('rdeps', 'so:libssl*', filter_substring='curl'), [])
+        self.assertEqual(self._names('rdeps', 'libcrypto3', filter_substring='curl'),
+                         [('libssl3', 1)])
+
+    def test_empty_filter_means_no_filter(self):
+        self.assertEqual(self._names('closure', 'git', filter_substring=''),
+                         self._names('closure', 'git'))
+        self.assertEqual(self._names('rdeps', 'so:libssl*', filter_substring=''),
+                         [('curl', 1), ('git', 2)])
+
+
+class ApkindexParserTest(unittest.TestCase):
+    """Один разбор APKINDEX для --package, SQLite, --watch и --all-packages."""
+
+    def test_parsers_agree_on_dependency_names(self):
+        visualizer = dv.DependencyVisualizer('', '', False, '', 10)
+        index = "C:Q1a=\nP:app\nD:python3~3.11 libfoo>=1.2 !conflict so:libc.so.1 libfoo\n\nP:libfoo\n"
+
+        records = visualizer._parse_apkindex_records(index)
+        self.assertEqual(records['app']['depends'],
+                         [('python3', '~3.11'), ('libfoo', '>=1.2'), ('so:libc.so.1', None)])
+        self.assertEqual(visualizer._parse_apkindex(index),
+                         {'app': ['python3', 'libfoo', 'so:libc.so.1'], 'libfoo': []})
+
+
+if __name__ == '__main__':
+    unittest.main()
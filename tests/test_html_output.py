@@ -0,0 +1,75 @@
+"""
+Тесты интерактивного HTML-представления графа (save_graph_to_html).
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from io import StringIO
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+DATA_START = '<script id="graph-data" type="application/json">'
+
+
+class SaveGraphToHtmlTest(unittest.TestCase):
+    """Проверка встроенного JSON: таблица имен, списки смежности, экранирование."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        output_file = os.path.join(self.tmp_dir.name, 'graph.html')
+
+        self.visualizer = dv.DependencyVisualizer('zlib', '', False, output_file, 1)
+        self.visualizer.package_cache = {
+            'zlib': ['musl', 'busybox', '</script><b>x'],
+            'musl': ['deep'],
+            'busybox': ['musl'],
+            '</script><b>x': [],
+            'deep': ['deeper'],
+        }
+        with redirect_stdout(StringIO()):
+            graph = self.visualizer.build_dependency_graph()
+            self.visualizer.save_graph_to_html(graph)
+
+        with open(output_file, encoding='utf-8') as f:
+            self.html = f.read()
+        start = self.html.index(DATA_START) + len(DATA_START)
+        self.raw_data = self.html[start:self.html.index('</script>', start)]
+        self.data = json.loads(self.raw_data)
+
+    def test_root_first_and_other_names_sorted(self):
+        names = self.data['names']
+        self.assertEqual(names[0], 'zlib')
+        self.assertEqual(names[1:], sorted(names[1:]))
+        self.assertEqual(set(names), {'zlib', 'musl', 'busybox', '</script><b>x', 'deep'})
+
+    def test_adjacency_uses_integer_ids(self):
+        names, adjacency = self.data['names'], self.data['adj']
+        self.assertEqual(len(adjacency), len(names))
+        for children in adjacency:
+            self.assertTrue(all(isinstance(child, int) for child in children))
+
+        index = {name: i for i, name in enumerate(names)}
+        self.assertEqual(adjacency[0], sorted(index[name] for name in ('musl', 'busybox', '</script><b>x')))
+
+    def test_out_of_depth_leaves_are_empty(self):
+        names, adjacency = self.data['names'], self.data['adj']
+        # deep находится за пределами --max-depth 1: узел есть, списка смежности нет
+        self.assertEqual(adjacency[names.index('deep')], [])
+        self.assertEqual(adjacency[names.index('musl')], [names.index('deep')])
+
+    def test_script_block_cannot_close_early(self):
+        self.assertNotIn('</', self.raw_data)
+        self.assertIn('<\\/script><b>x', self.raw_data)
+        self.assertIn('</script><b>x', self.data['names'])
+
+
+if __name__ == '__main__':
+    unittest.main()
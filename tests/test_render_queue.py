@@ -0,0 +1,147 @@
+"""
+Тесты пакетного рендеринга MermaidRenderQueue с поддельным mmdc в PATH.
+"""
+
+import os
+import stat
+import sys
+import tempfile
+import textwrap
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+# Поддельный mmdc: записывает вызовы в журнал и создает SVG так же, как
+# настоящий mmdc (для Markdown-входа - <output>-1.svg, <output>-2.svg, ...)
+FAKE_MMDC = textwrap.dedent('''\
+    #!{python}
+    import os, re, sys
+    args = sys.argv[1:]
+    with open(os.environ['FAKE_MMDC_LOG'], 'a') as log:
+        log.write(' '.join(args) + '\\n')
+    if args == ['--version']:
+        print(os.environ.get('FAKE_MMDC_VERSION', '10.6.1'))
+        sys.exit(0)
+    source = args[args.index('-i') + 1]
+    target = args[args.index('-o') + 1]
+    with open(source) as f:
+        text = f.read()
+    if source.endswith('.md'):
+        if os.environ.get('FAKE_MMDC_FAIL_MARKDOWN'):
+            sys.exit(1)
+        base, ext = os.path.splitext(target)
+        for number, block in enumerate(re.findall(r'```mermaid\\n(.*?)```', text, re.S), 1):
+            with open(f'{{base}}-{{number}}{{ext}}', 'w') as f:
+                f.write('<svg>' + block.replace('-->', '=>') + '</svg>')
+    else:
+        with open(target, 'w') as f:
+            f.write('<svg>' + text.replace('-->', '=>') + '</svg>')
+''')
+
+
+class MermaidRenderQueueTest(unittest.TestCase):
+    """Проверка однократного опроса mmdc, пакетного рендеринга и пропуска по хешу."""
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+
+        bin_dir = os.path.join(self.tmp_dir.name, 'bin')
+        os.mkdir(bin_dir)
+        mmdc = os.path.join(bin_dir, 'mmdc')
+        with open(mmdc, 'w') as f:
+            f.write(FAKE_MMDC.format(python=sys.executable))
+        os.chmod(mmdc, os.stat(mmdc).st_mode | stat.S_IEXEC)
+
+        self.log_file = os.path.join(self.tmp_dir.name, 'mmdc.log')
+        environ = {'PATH': bin_dir + os.pathsep + os.environ.get('PATH', ''),
+                   'FAKE_MMDC_LOG': self.log_file}
+        patcher = mock.patch.dict(os.environ, environ)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        dv.probe_mmdc.cache_clear()
+        self.addCleanup(dv.probe_mmdc.cache_clear)
+
+        self.graphs = []
+        for number in range(1, 7):
+            mermaid_file = os.path.join(self.tmp_dir.name, f'g{number}.mmd')
+            with open(mermaid_file, 'w') as f:
+                f.write(f'graph TD\n    N{number} --> M\n')
+            self.graphs.append(mermaid_file)
+
+    def _calls(self):
+        """Вызовы mmdc из журнала."""
+        if not os.path.exists(self.log_file):
+            return []
+        with open(self.log_file) as f:
+            return [line.split() for line in f.read().splitlines()]
+
+    def _render(self, **kwargs):
+        queue = dv.MermaidRenderQueue(**kwargs)
+        for mermaid_file in self.graphs:
+            queue.add(mermaid_file)
+        return queue.run()
+
+    def _assert_rendered(self):
+        for number, mermaid_file in enumerate(self.graphs, 1):
+            with open(mermaid_file[:-4] + '.svg') as f:
+                self.assertIn(f'N{number} => M', f.read())
+
+    def test_probe_runs_once_per_process(self):
+        self._render(jobs=2)
+        self._render(jobs=2)
+        dv.probe_mmdc()
+
+        version_calls = [call for call in self._calls() if call == ['--version']]
+        self.assertEqual(len(version_calls), 1)
+
+    def test_markdown_batches_split_into_numbered_svgs(self):
+        stats = self._render(jobs=2, batch_size=3)
+
+        self.assertEqual(stats, {'rendered': 6, 'skipped': 0, 'failed': 0})
+        render_calls = [call for call in self._calls() if call != ['--version']]
+        self.assertEqual(len(render_calls), 2)
+        for call in render_calls:
+            self.assertTrue(call[call.index('-i') + 1].endswith('batch.md'))
+        self._assert_rendered()
+
+    def test_per_file_fallback_when_batch_fails(self):
+        with mock.patch.dict(os.environ, {'FAKE_MMDC_FAIL_MARKDOWN': '1'}):
+            stats = self._render(jobs=2, batch_size=3)
+
+        self.assertEqual(stats, {'rendered': 6, 'skipped': 0, 'failed': 0})
+        inputs = [call[call.index('-i') + 1] for call in self._calls() if call != ['--version']]
+        self.assertEqual(sum(source.endswith('batch.md') for source in inputs), 2)
+        self.assertEqual(sorted(source for source in inputs if source.endswith('.mmd')), sorted(self.graphs))
+        self._assert_rendered()
+
+    def test_old_mmdc_renders_each_file_separately(self):
+        with mock.patch.dict(os.environ, {'FAKE_MMDC_VERSION': '9.1.0'}):
+            stats = self._render(jobs=2)
+
+        self.assertEqual(stats['rendered'], 6)
+        inputs = [call[call.index('-i') + 1] for call in self._calls() if call != ['--version']]
+        self.assertEqual(sorted(inputs), sorted(self.graphs))
+
+    def test_unchanged_graphs_are_skipped(self):
+        self._render(jobs=2)
+        calls_before = len(self._calls())
+
+        self.assertEqual(self._render(jobs=2), {'rendered': 0, 'skipped': 6, 'failed': 0})
+        self.assertEqual(len(self._calls()), calls_before)
+
+        with open(self.graphs[0], 'a') as f:
+            f.write('    M --> K\n')
+        self.assertEqual(self._render(jobs=2), {'rendered': 1, 'skipped': 5, 'failed': 0})
+        new_calls = self._calls()[calls_before:]
+        self.assertEqual(len(new_calls), 1)
+        self.assertEqual(new_calls[0][new_calls[0].index('-i') + 1], self.graphs[0])
+
+
+if __name__ == '__main__':
+    unittest.main()
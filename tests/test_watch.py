@@ -0,0 +1,203 @@
+"""
+Тесты режима наблюдения DependencyWatcher с локальным HTTP-сервером,
+отдающим изменяющийся APKINDEX.tar.gz.
+"""
+
+import functools
+import io
+import os
+import sys
+import tarfile
+import tempfile
+import threading
+import unittest
+from http.server import SimpleHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import dependency_visualizer as dv
+
+
+INDEX_V1 = {
+    'app': ('a1', ['libfoo', 'libbar']),
+    'libfoo': ('b1', ['musl']),
+    'libbar': ('c1', []),
+    'musl': ('d1', []),
+    'tool': ('e1', ['musl']),
+    'other': ('f1', ['libbar']),
+}
+
+# libbar получает новую зависимость zlib: затронуты app и other, но не tool
+INDEX_V2 = dict(INDEX_V1, libbar=('c2', ['zlib']), zlib=('z1', []))
+
+
+class RecordingHandler(SimpleHTTPRequestHandler):
+    """Обработчик http.server, запоминающий коды ответов."""
+
+    statuses = None
+
+    def log_request(self, code='-', size='-'):
+        self.statuses.append(int(code))
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ETagHandler(RecordingHandler):
+    """Обработчик с поддержкой ETag / If-None-Match поверх http.server."""
+
+    def _etag(self):
+        stat = os.stat(self.translate_path(self.path))
+        return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+    def send_head(self):
+        if self.headers.get('If-None-Match') == self._etag():
+            self.send_response(304)
+            self.end_headers()
+            return None
+        return super().send_head()
+
+    def end_headers(self):
+        if os.path.isfile(self.translate_path(self.path)):
+            self.send_header('ETag', self._etag())
+        super().end_headers()
+
+
+class DependencyWatcherTest(unittest.TestCase):
+    """Опрос по ETag и Last-Modified, сравнение контрольных сумм и перегенерация корней."""
+
+    handler = ETagHandler
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.repo_dir = os.path.join(self.tmp_dir.name, 'repo')
+        self.output_dir = os.path.join(self.tmp_dir.name, 'out')
+        os.mkdir(self.repo_dir)
+        self.mtime = 1_700_000_000
+        self._publish(INDEX_V1)
+
+        self.statuses = []
+        handler = type('Handler', (self.handler,), {'statuses': self.statuses})
+        server = ThreadingHTTPServer(('127.0.0.1', 0),
+                                     functools.partial(handler, directory=self.repo_dir))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+
+        # Без mmdc очередь создает SVG с предварительным просмотром
+        patcher = mock.patch.object(dv, 'probe_mmdc', return_value=None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        visualizer = dv.DependencyVisualizer('', f'http://127.0.0.1:{server.server_port}',
+                                             False, self.output_dir, 10)
+        self.watcher = dv.DependencyWatcher(visualizer, ['app', 'tool', 'other'],
+                                            self.output_dir, interval=0)
+
+    def _publish(self, index):
+        """Запись APKINDEX.tar.gz с новым временем изменения."""
+        content = '\n\n'.join(
+            f'C:{checksum}\nP:{name}' + (f"\nD:{' '.join(deps)}" if deps else '')
+            for name, (checksum, deps) in index.items()).encode('utf-8') + b'\n'
+        archive = io.BytesIO()
+        with tarfile.open(fileobj=archive, mode='w:gz') as tar:
+            info = tarfile.TarInfo('APKINDEX')
+            info.size = len(content)
+            tar.addfile(info, io.BytesIO(content))
+
+        path = os.path.join(self.repo_dir, 'APKINDEX.tar.gz')
+        with open(path, 'wb') as f:
+            f.write(archive.getvalue())
+        # Last-Modified в http.server имеет точность в одну секунду:
+        # каждая публикация сдвигает время изменения на несколько секунд
+        self.mtime += 5
+        os.utime(path, (self.mtime, self.mtime))
+
+    def _read(self, root):
+        with open(os.path.join(self.output_dir, root + '.mmd'), encoding='utf-8') as f:
+            return f.read()
+
+    def test_unchanged_index_is_not_downloaded_again(self):
+        self.assertIsNotNone(self.watcher.poll())
+        self.assertIsNone(self.watcher.poll())
+        self.assertEqual(self.statuses, [200, 304])
+        if self.handler is ETagHandler:
+            self.assertIsNotNone(self.watcher.etag)
+
+        self._publish(INDEX_V2)
+        records = self.watcher.poll()
+        self.assertEqual(records['libbar']['depends'], [('zlib', None)])
+        self.assertEqual(self.statuses, [200, 304, 200])
+
+    def test_fetch_apkindex_returns_content(self):
+        self.assertIn('P:libbar', self.watcher.visualizer._fetch_apkindex())
+
+    def test_only_affected_roots_are_regenerated(self):
+        self.assertEqual(self.watcher.update(self.watcher.poll()), ['app', 'tool', 'other'])
+        tool_mtime = os.stat(os.path.join(self.output_dir, 'tool.mmd')).st_mtime_ns
+
+        self._publish(INDEX_V2)
+        self.assertEqual(self.watcher.update(self.watcher.poll()), ['app', 'other'])
+        self.assertIn('libbar --> zlib', self._read('other'))
+        self.assertIn('libbar --> zlib', self._read('app'))
+        self.assertEqual(os.stat(os.path.join(self.output_dir, 'tool.mmd')).st_mtime_ns, tool_mtime)
+
+        # Новые записи с прежними контрольными суммами ничего не затрагивают
+        self.assertEqual(self.watcher.update(self._records(INDEX_V2)), [])
+
+    def _records(self, index):
+        return {name: {'version': None, 'provides': [], 'checksum': checksum,
+                       'depends': [(dep, None) for dep in deps]}
+                for name, (checksum, deps) in index.items()}
+
+    def test_failed_regeneration_is_retried(self):
+        self.watcher.run(max_cycles=1)
+        self._publish(INDEX_V2)
+
+        failing = mock.patch.object(self.watcher.render_queue, 'run',
+                                    return_value={'rendered': 0, 'skipped': 0, 'failed': 1})
+        with failing:
+            self.watcher.run(max_cycles=1)
+        self.assertEqual(self.watcher.checksums['libbar'], 'c1')
+        self.assertNotIn('zlib', self.watcher.closures['other'])
+
+        # Индекс больше не меняется (304), но необработанные изменения повторяются
+        self.watcher.run(max_cycles=1)
+        self.assertEqual(self.statuses[-1], 304)
+        self.assertEqual(self.watcher.checksums['libbar'], 'c2')
+        self.assertIn('zlib', self.watcher.closures['other'])
+        self.assertIn('libbar --> zlib', self._read('other'))
+
+
+class LastModifiedWatcherTest(DependencyWatcherTest):
+    """Те же проверки для сервера без ETag (только If-Modified-Since)."""
+
+    handler = RecordingHandler
+
+
+class TestRepositoryPollTest(unittest.TestCase):
+    """Опрос тестового файла репозитория."""
+
+    def test_signature_is_saved_only_after_successful_read(self):
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            repo_file = os.path.join(tmp_dir, 'repo.txt')
+            with open(repo_file, 'w', encoding='utf-8') as f:
+                f.write('A: B\nB:\n')
+
+            visualizer = dv.DependencyVisualizer('', repo_file, True, tmp_dir, 10)
+            watcher = dv.DependencyWatcher(visualizer, ['A'], tmp_dir, interval=0)
+
+            with mock.patch.object(visualizer, 'load_package_records',
+                                   side_effect=Exception('файл записывается')):
+                with self.assertRaises(Exception):
+                    watcher.poll()
+
+            records = watcher.poll()
+            self.assertEqual(records['A']['depends'], [('B', None)])
+            self.assertIsNone(watcher.poll())
+
+
+if __name__ == '__main__':
+    unittest.main()